@@ -1,46 +1,127 @@
-# pip install -qU langchain-xai langchain-google-genai python-dotenv
+# pip install -qU langchain-xai langchain-google-genai python-dotenv aiolimiter tiktoken "httpx[http2]"
 import os
+import re
+import sys
+import queue
+import atexit
+import asyncio
+import functools
 import logging
+import logging.handlers
+import hashlib
+import weakref
 import argparse
-from dotenv import load_dotenv
-from langchain_xai import ChatXAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from aiolimiter import AsyncLimiter
+from dotenv import find_dotenv, load_dotenv
+
+# LangChain, openai, tiktoken and httpx are imported where used to keep CLI startup fast
+
+_log_queue = queue.SimpleQueue()
+# Pooled connections cannot outlive the event loop that opened them, so async
+# xAI requests share one HTTP/2 client per loop
+_http_async_clients = weakref.WeakKeyDictionary()
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.?!])\s+')
+
+
+@functools.cache
+def _load_env() -> str:
+    """
+    Load the .env file once per process.
+    
+    Returns:
+        str: Path of the loaded .env file, or an empty string if none was found.
+    """
+    # find_dotenv() also checks next to this script and its parent directories
+    dotenv_path = find_dotenv()
+    if dotenv_path:
+        load_dotenv(dotenv_path)
+    return dotenv_path
+
+
+def _get_http_async_client():
+    """Return the pooled HTTP/2 client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _http_async_clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+        
+        client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=httpx.Timeout(60, connect=5),
+        )
+        _http_async_clients[loop] = client
+    return client
 
 
 class AgentMain:
     """Main agent class for news queries using xAI's Grok API or Google Gemini."""
     
-    def __init__(self, model_source: str = "grok", api_key: str = None):
+    MODEL_NAMES = {
+        "grok": "grok-3-latest",
+        "gemini": "gemini-1.5-flash",
+    }
+    
+    # Chat models shared across instances, keyed by (source, model, API key hash)
+    _llm_cache = {}
+    # Same, for async calls; keyed by event loop first because the models' HTTP
+    # pools and gRPC channels are bound to the loop that first used them
+    _async_llm_cache = weakref.WeakKeyDictionary()
+    
+    def __init__(self, model_source: str = "grok", api_key: str = None,
+                 requests_per_minute: int = 60, tokens_per_minute: int = 60000):
         """
         Initialize the AgentMain class.
         
         Args:
             model_source (str): Model source - either "grok" or "gemini"
             api_key (str, optional): API key. If not provided, will load from environment.
+            requests_per_minute (int): Request budget for async calls.
+            tokens_per_minute (int): Prompt token budget for async calls.
         """
         self.model_source = model_source.lower()
+        self.model_name = self.MODEL_NAMES.get(self.model_source)
         self.api_key = api_key
         self.logger = self._setup_logging()
         
+        # Pace async requests before the provider starts returning 429s
+        self._rpm = AsyncLimiter(max_rate=requests_per_minute, time_period=60)
+        self._tpm = AsyncLimiter(max_rate=tokens_per_minute, time_period=60)
+        # Tokenizer for the token limiter, loaded on first async use or by warm()
+        self._encoding = None
+        self._encoding_loaded = False
+        
         # Load environment variables
-        load_dotenv()
-        self.logger.info("✓ Environment variables loaded from .env file")
+        dotenv_path = _load_env()
+        if dotenv_path:
+            self.logger.info("✓ Environment variables loaded from %s", dotenv_path)
+        else:
+            self.logger.info("No .env file found, using existing environment variables")
         
         # Validate and set API key
         self._validate_api_key()
         
-        self.logger.info(f"Initialized agent with {self.model_source} model")
+        self.logger.info("Initialized agent with %s model", self.model_source)
     
     def _setup_logging(self) -> logging.Logger:
         """Set up logging configuration."""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
+        root_logger = logging.getLogger()
+        if not root_logger.handlers:
+            # Handlers run on the listener thread so callers never block on log I/O
+            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            handlers = [
                 logging.StreamHandler(),
-                logging.FileHandler('agent.log')
+                logging.FileHandler('agent.log', delay=True)
             ]
-        )
+            for handler in handlers:
+                handler.setFormatter(formatter)
+            listener = logging.handlers.QueueListener(_log_queue, *handlers)
+            listener.start()
+            atexit.register(listener.stop)
+            
+            root_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+            root_logger.setLevel(logging.INFO)
         return logging.getLogger(__name__)
     
     def _validate_api_key(self) -> None:
@@ -58,55 +139,357 @@ class AgentMain:
                 raise ValueError(f"Unsupported model source: {self.model_source}")
         
         if not self.api_key:
-            self.logger.error(f"{key_name} not found in environment variables or .env file.")
+            self.logger.error("%s not found in environment variables or .env file.", key_name)
             self.logger.error("Please check your .env file or set the environment variable.")
-            self.logger.error(f"You can get an API key from: {key_url}")
+            self.logger.error("You can get an API key from: %s", key_url)
             raise ValueError(f"{key_name} is required")
     
-    def run_chat(self) -> None:
-        """Run a chat session with the agent."""
-        self.logger.info(f"Running chat session with {self.model_source} model...")
+    def _create_llm(self, http_async_client=None):
+        """
+        Create the chat model for the configured model source.
+        
+        Args:
+            http_async_client (optional): Pooled httpx.AsyncClient for async xAI calls.
+        """
+        if self.model_source == "grok":
+            from langchain_xai import ChatXAI
+            return ChatXAI(
+                model=self.model_name,
+                api_key=self.api_key,
+                http_async_client=http_async_client,
+                search_parameters={
+                    "mode": "auto",
+                    "max_search_results": 3,
+                    "from_date": "2025-06-25",
+                    "to_date": "2025-06-26",
+                },
+            )
+        elif self.model_source == "gemini":
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return ChatGoogleGenerativeAI(
+                model=self.model_name,
+                api_key=self.api_key,
+                temperature=0.7,
+            )
+        else:
+            raise ValueError(f"Unsupported model source: {self.model_source}")
+    
+    def _llm_cache_key(self) -> tuple:
+        """Key identifying this agent's chat model configuration."""
+        key_hash = hashlib.sha256(self.api_key.encode()).hexdigest()
+        return (self.model_source, self.model_name, key_hash)
+    
+    def _get_llm(self):
+        """Return a cached chat model, creating it on first use."""
+        cache_key = self._llm_cache_key()
+        if cache_key not in self._llm_cache:
+            self._llm_cache[cache_key] = self._create_llm()
+        return self._llm_cache[cache_key]
+    
+    def _get_async_llm(self):
+        """Return a cached chat model for async calls on the running event loop."""
+        loop_cache = self._async_llm_cache.setdefault(asyncio.get_running_loop(), {})
+        cache_key = self._llm_cache_key()
+        llm = loop_cache.get(cache_key)
+        if self.model_source == "grok":
+            client = _get_http_async_client()
+            if llm is None or llm.http_async_client is not client:
+                llm = loop_cache[cache_key] = self._create_llm(http_async_client=client)
+        elif llm is None:
+            # Gemini caches a gRPC asyncio channel bound to the first loop it runs on
+            llm = loop_cache[cache_key] = self._create_llm()
+        return llm
+    
+    @classmethod
+    def warm(cls, model_source: str = "grok", api_key: str = None) -> "AgentMain":
+        """
+        Create an agent and pre-instantiate its chat model.
+        
+        Useful for warm starts so the first run_chat() skips client construction.
+        Async calls use per-event-loop models; warm those with awarm() from
+        inside the loop that will make the requests.
+        
+        Args:
+            model_source (str): Model source - either "grok" or "gemini"
+            api_key (str, optional): API key. If not provided, will load from environment.
+            
+        Returns:
+            AgentMain: The warmed agent.
+        """
+        agent = cls(model_source=model_source, api_key=api_key)
+        agent._get_llm()
+        return agent
+    
+    async def awarm(self) -> None:
+        """
+        Pre-build the async chat model for the running event loop and load the tokenizer.
         
+        Call this inside the loop that will run aquery(), aquery_many() or
+        stream_sentences() so the first request skips client and tokenizer setup.
+        """
+        self._get_async_llm()
+        await asyncio.to_thread(self._load_encoding)
+    
+    def _load_encoding(self) -> None:
+        """Load the tokenizer used to estimate prompt sizes for rate limiting."""
+        if self._encoding_loaded:
+            return
         try:
-            if self.model_source == "grok":
-                llm = ChatXAI(
-                    model="grok-3-latest",
-                    api_key=self.api_key,
-                    search_parameters={
-                        "mode": "auto",
-                        "max_search_results": 3,
-                        "from_date": "2025-06-25",
-                        "to_date": "2025-06-26",
-                    },
-                )
-            elif self.model_source == "gemini":
-                llm = ChatGoogleGenerativeAI(
-                    model="gemini-1.5-flash",
-                    api_key=self.api_key,
-                    temperature=0.7,
-                )
-            else:
-                raise ValueError(f"Unsupported model source: {self.model_source}")
+            import tiktoken
+            
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model_name)
+            except KeyError:
+                # Grok and Gemini tokenizers aren't published; cl100k is a close
+                # estimate, but fetching it may need the network on first use
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            self.logger.warning("Tokenizer unavailable, estimating tokens from text length: %s", e)
+        self._encoding_loaded = True
+    
+    def _count_tokens(self, text: str) -> int:
+        """Estimate the number of tokens in text for rate limiting."""
+        if self._encoding is None:
+            # Roughly four characters per token for English text
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text))
+    
+    def run_chat(self, stream: bool = True) -> None:
+        """
+        Run a chat session with the agent.
+        
+        Args:
+            stream (bool): Print tokens as they arrive instead of waiting for
+                the full response. Set to False to fall back to invoke().
+        """
+        self.logger.info("Running chat session with %s model...", self.model_source)
+        
+        try:
+            llm = self._get_llm()
             
             self.logger.info("Requesting world news digest...")
-            response = llm.invoke("Provide me a digest of world news in the last 24 hours.")
+            prompt = "Provide me a digest of world news in the last 24 hours."
             
             print("\n" + "="*50)
             print(f"WORLD NEWS DIGEST ({self.model_source.upper()})")
             print("="*50)
-            print(response.content)
+            if stream:
+                for chunk in llm.stream(prompt):
+                    sys.stdout.write(chunk.content)
+                    sys.stdout.flush()
+                print()
+            else:
+                response = llm.invoke(prompt)
+                print(response.content)
             print("="*50)
             
             self.logger.info("Chat session completed successfully")
             
         except Exception as e:
-            self.logger.error(f"Error during chat session: {e}")
+            self.logger.error("Error during chat session: %s", e)
             print(f"Error: {e}")
             raise
+    
+    async def _throttle(self, *prompts: str, charge_tokens: bool = True) -> None:
+        """Wait until the rate limits allow one request carrying prompts."""
+        async with self._rpm:
+            if charge_tokens:
+                if not self._encoding_loaded:
+                    # Loading may download the BPE file, so keep it off the event loop
+                    await asyncio.to_thread(self._load_encoding)
+                # A single oversized request can never fit the bucket, so cap the debit
+                tokens = sum(self._count_tokens(prompt) for prompt in prompts)
+                await self._tpm.acquire(min(tokens, self._tpm.max_rate))
+    
+    async def aquery(self, prompt: str, llm=None, charge_tokens: bool = True) -> str:
+        """
+        Send a single prompt to the model asynchronously.
+        
+        Args:
+            prompt (str): Prompt to send.
+            llm (optional): Chat model to use. Defaults to the cached model.
+            charge_tokens (bool): Debit the prompt from the token limiter. Set to
+                False when its tokens were already charged, e.g. by batch_complete().
+            
+        Returns:
+            str: The model's response text.
+        """
+        llm = llm or self._get_async_llm()
+        await self._throttle(prompt, charge_tokens=charge_tokens)
+        response = await llm.ainvoke(prompt)
+        return response.content
+    
+    async def stream_sentences(
+        self,
+        prompt: str,
+        on_sentence: Optional[Callable[[str], Awaitable[None]]] = None,
+        max_words: int = 80,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the model's response one sentence at a time.
+        
+        Streamed text is split after every ".", "?" or "!" followed by
+        whitespace, and the trailing partial sentence stays buffered until more
+        text arrives or it grows past max_words. Downstream stages such as TTS
+        or UI rendering can then start before the full response is generated.
+        
+        Args:
+            prompt (str): Prompt to send.
+            on_sentence (callable, optional): Coroutine function awaited with
+                each sentence before it is yielded.
+            max_words (int): Flush the buffer once it exceeds this many words.
+            
+        Yields:
+            str: Each completed sentence.
+        """
+        llm = self._get_async_llm()
+        await self._throttle(prompt)
+        
+        buffer = ""
+        async for chunk in llm.astream(prompt):
+            # A chunk may close several sentences; keep only the last, partial one
+            *sentences, buffer = _SENTENCE_BOUNDARY.split(buffer + chunk.content)
+            if len(buffer.split()) > max_words:
+                sentences.append(buffer)
+                buffer = ""
+            for sentence in sentences:
+                sentence = sentence.strip()
+                if sentence:
+                    if on_sentence:
+                        await on_sentence(sentence)
+                    yield sentence
+        
+        if buffer.strip():
+            sentence = buffer.strip()
+            if on_sentence:
+                await on_sentence(sentence)
+            yield sentence
+    
+    async def aquery_many(self, prompts: list[str], max_concurrency: int = 4,
+                          charge_tokens: bool = True) -> list:
+        """
+        Send several independent prompts concurrently.
+        
+        Args:
+            prompts (list[str]): Prompts to send.
+            max_concurrency (int): Maximum number of requests in flight at once.
+            charge_tokens (bool): Debit the prompts from the token limiter.
+            
+        Returns:
+            list: Response text for each prompt, in input order. Failed requests
+                are returned as the raised exception.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        
+        self.logger.info("Sending %d prompts to %s model...", len(prompts), self.model_source)
+        llm = self._get_async_llm()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def bounded_query(prompt: str) -> str:
+            async with semaphore:
+                return await self.aquery(prompt, llm=llm, charge_tokens=charge_tokens)
+        
+        return await asyncio.gather(
+            *(bounded_query(prompt) for prompt in prompts),
+            return_exceptions=True,
+        )
+    
+    async def aclose(self) -> None:
+        """Close the running loop's HTTP connection pool and drop models bound to the loop."""
+        loop = asyncio.get_running_loop()
+        self._async_llm_cache.pop(loop, None)
+        client = _http_async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+    
+    async def _aquery_many_and_close(self, prompts: list[str], max_concurrency: int = 4) -> list:
+        """Run aquery_many() and close the loop's HTTP pool before the loop exits."""
+        try:
+            return await self.aquery_many(prompts, max_concurrency=max_concurrency)
+        finally:
+            await self.aclose()
+    
+    def batch_complete(self, prompts: list[str], max_tokens: int = 512,
+                       max_concurrency: int = 4) -> list:
+        """
+        Complete several prompts with a single /completions request.
+        
+        This talks to the OpenAI-compatible xAI endpoint directly, since
+        LangChain's batch() still issues one request per prompt. Sources or
+        endpoints that reject list prompts, and any prompts missing from the
+        response, fall back to aquery_many().
+        
+        The request is paced by the same rate limiters as the async calls.
+        This method drives them with asyncio.run(), so it cannot be called
+        from inside a running event loop.
+        
+        Args:
+            prompts (list[str]): Prompts to complete.
+            max_tokens (int): Maximum tokens to generate per prompt.
+            max_concurrency (int): Maximum requests in flight when falling back.
+            
+        Returns:
+            list: Completion text for each prompt, in input order. Failed
+                fallback requests are returned as the raised exception.
+        """
+        if not prompts:
+            return []
+        return asyncio.run(self._abatch_complete(prompts, max_tokens, max_concurrency))
+    
+    async def _abatch_complete(self, prompts: list[str], max_tokens: int,
+                               max_concurrency: int) -> list:
+        """Event-loop half of batch_complete(), so limiters stay on one loop."""
+        try:
+            results = {}
+            if self.model_source == "grok":
+                import openai
+                
+                # Charge every prompt's tokens once; a fallback only costs requests
+                await self._throttle(*prompts)
+                async with openai.AsyncOpenAI(
+                    api_key=self.api_key, base_url="https://api.x.ai/v1"
+                ) as client:
+                    try:
+                        response = await client.completions.create(
+                            model=self.model_name,
+                            prompt=prompts,
+                            max_tokens=max_tokens,
+                        )
+                    except (openai.BadRequestError, openai.NotFoundError) as e:
+                        self.logger.warning("Batched completion rejected, sending prompts individually: %s", e)
+                    else:
+                        # Choices are not guaranteed to come back in prompt order
+                        results = {choice.index: choice.text for choice in response.choices}
+            
+            missing = [index for index in range(len(prompts)) if index not in results]
+            if results and missing:
+                self.logger.warning(
+                    "Batched completion returned %d of %d choices, sending the rest individually",
+                    len(prompts) - len(missing), len(prompts),
+                )
+            if missing:
+                retried = await self.aquery_many(
+                    [prompts[index] for index in missing],
+                    max_concurrency=max_concurrency,
+                    charge_tokens=self.model_source != "grok",
+                )
+                results.update(zip(missing, retried))
+            return [results[index] for index in range(len(prompts))]
+        finally:
+            await self.aclose()
 
+def _positive_int(value: str) -> int:
+    """argparse type for integers that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
-def parse_arguments():
-    """Parse command line arguments."""
+
+@functools.cache
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser once per process."""
     parser = argparse.ArgumentParser(
         description="News digest agent using xAI Grok or Google Gemini",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -115,6 +498,7 @@ Examples:
   python AgentMain.py -m grok      # Use xAI Grok model
   python AgentMain.py -m gemini    # Use Google Gemini model
   python AgentMain.py              # Default to Grok model
+  python AgentMain.py --prompts "Summarize AI news" "Summarize sports news"
         """
     )
     
@@ -125,7 +509,52 @@ Examples:
         help="Choose the LLM model source (default: grok)"
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Wait for the full response instead of streaming tokens"
+    )
+    
+    parser.add_argument(
+        "--prompts",
+        nargs="+",
+        metavar="PROMPT",
+        help="Send several prompts concurrently instead of the news digest"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Send --prompts in a single completions request where supported"
+    )
+    
+    parser.add_argument(
+        "--max-concurrency",
+        type=_positive_int,
+        default=4,
+        help="Maximum concurrent requests when using --prompts (default: 4)"
+    )
+    
+    parser.add_argument(
+        "--rpm",
+        type=_positive_int,
+        default=60,
+        help="Requests per minute allowed when using --prompts (default: 60)"
+    )
+    
+    parser.add_argument(
+        "--tpm",
+        type=_positive_int,
+        default=60000,
+        help="Prompt tokens per minute allowed when using --prompts (default: 60000)"
+    )
+    
+    return parser
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    return _build_parser().parse_args()
 
 
 def main():
@@ -135,8 +564,31 @@ def main():
         args = parse_arguments()
         
         # Create and run the agent
-        agent = AgentMain(model_source=args.model)
-        agent.run_chat()
+        agent = AgentMain(
+            model_source=args.model,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+        )
+        if args.prompts:
+            if args.batch:
+                results = agent.batch_complete(
+                    args.prompts, max_concurrency=args.max_concurrency
+                )
+            else:
+                results = asyncio.run(
+                    agent._aquery_many_and_close(
+                        args.prompts, max_concurrency=args.max_concurrency
+                    )
+                )
+            for prompt, result in zip(args.prompts, results):
+                print("\n" + "="*50)
+                print(prompt)
+                print("="*50)
+                print(f"Error: {result}" if isinstance(result, Exception) else result)
+            if any(isinstance(result, Exception) for result in results):
+                return 1
+        else:
+            agent.run_chat(stream=not args.no_stream)
     except Exception as e:
         print(f"Error: {e}")
         return 1
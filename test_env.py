@@ -1,9 +1,11 @@
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file unless the shell already set them
+if 'XAI_API_KEY' not in os.environ:
+    load_dotenv()
+    print("✓ Environment variables loaded from .env file")
 
-print("✓ Environment variables loaded from .env file")
-print(f"XAI_API_KEY exists: {bool(os.getenv('XAI_API_KEY'))}")
-print(f"XAI_API_KEY: {os.getenv('XAI_API_KEY')[:10]}...")
+xai_api_key = os.getenv('XAI_API_KEY')
+print(f"XAI_API_KEY exists: {bool(xai_api_key)}")
+print(f"XAI_API_KEY: {xai_api_key[:10] + '...' if xai_api_key else '<not set>'}")